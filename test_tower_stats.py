@@ -0,0 +1,148 @@
+"""Tests for the Tower statistics parser and tracker."""
+
+import json
+from dataclasses import asdict
+from pathlib import Path
+
+from tower_stats import TowerStatsParser, TowerStatsTracker
+
+SAMPLE_STATS = (Path(__file__).parent / "test-stats.txt").read_text(encoding="utf-8")
+
+
+def without_metadata(stats):
+    data = asdict(stats)
+    del data["timestamp"], data["session_id"]
+    return data
+
+
+def dumped(sessions):
+    return json.dumps(sessions, indent=2, ensure_ascii=False)
+
+
+def test_parse_tab_separated_export():
+    stats = TowerStatsParser().parse_stats(SAMPLE_STATS)
+
+    assert stats.game_time == "2d 14h 15m 14s"
+    assert stats.tier == 11
+    assert stats.wave == 9743
+    assert stats.killed_by == "Ray"
+    assert stats.coins_earned == "118,26T"
+    assert stats.cells_earned == "255,89K"
+    assert stats.total_enemies == 837873
+
+
+def test_parse_space_padded_matches_tabs():
+    parser = TowerStatsParser()
+    padded = SAMPLE_STATS.replace("\t", "    ")
+
+    assert without_metadata(parser.parse_stats(padded)) == without_metadata(parser.parse_stats(SAMPLE_STATS))
+
+
+def test_parse_int_fields():
+    stats = TowerStatsParser().parse_stats("Wave  1,234\nTier  eleven\nUnknown Field  5\nno value")
+
+    assert stats.wave == 1234
+    assert stats.tier == 0
+
+
+def test_batch_session_ids_are_unique(tmp_path):
+    tracker = TowerStatsTracker(str(tmp_path / "tower_stats.json"))
+    added = tracker.add_sessions(["Tier  1\nWave  10"] * 50)
+
+    ids = [stats.session_id for stats in added]
+    assert len(set(ids)) == len(ids)
+    assert all(session_id.startswith("session_") for session_id in ids)
+
+
+def test_add_session_saves_data_file(tmp_path):
+    data_file = tmp_path / "tower_stats.json"
+    tracker = TowerStatsTracker(str(data_file))
+
+    stats = tracker.add_session(SAMPLE_STATS)
+
+    saved = json.loads(data_file.read_text(encoding="utf-8"))
+    assert [session["session_id"] for session in saved] == [stats.session_id]
+
+
+def test_save_data_layout(tmp_path):
+    data_file = tmp_path / "tower_stats.json"
+    tracker = TowerStatsTracker(str(data_file))
+
+    tracker.save_data()
+    assert data_file.read_text(encoding="utf-8") == dumped([])
+
+    tracker.add_sessions([SAMPLE_STATS, "Killed By  \"Bössé\"\nWave  3"])
+    assert data_file.read_text(encoding="utf-8") == dumped(tracker.sessions)
+
+    tracker.add_sessions(["Wave  4"])
+    assert data_file.read_text(encoding="utf-8") == dumped(tracker.sessions)
+
+    reloaded = TowerStatsTracker(str(data_file))
+    assert reloaded.sessions == tracker.sessions
+    reloaded.add_sessions(["Wave  5"])
+    assert data_file.read_text(encoding="utf-8") == dumped(reloaded.sessions)
+    assert not (tmp_path / "tower_stats.json.tmp").exists()
+
+
+def test_journal_replay_and_compaction(tmp_path):
+    data_file = tmp_path / "tower_stats.json"
+    tracker = TowerStatsTracker(str(data_file))
+    tracker.add_sessions(["Wave  1"])
+    tracker.add_sessions(["Wave  2", "Wave  3"], save=False)
+
+    tracker.append_journal(1, tracker.sessions[1:])
+
+    reloaded = TowerStatsTracker(str(data_file))
+    assert reloaded.sessions == tracker.sessions
+    assert reloaded.journal_entries == 2
+
+    reloaded.save_data()
+    assert not tracker.journal_file.exists()
+    assert data_file.read_text(encoding="utf-8") == dumped(tracker.sessions)
+    assert TowerStatsTracker(str(data_file)).sessions == tracker.sessions
+
+
+def test_journal_skips_compacted_and_torn_entries(tmp_path):
+    data_file = tmp_path / "tower_stats.json"
+    tracker = TowerStatsTracker(str(data_file))
+    tracker.add_sessions(["Wave  1", "Wave  2"], save=False)
+    tracker.append_journal(0, tracker.sessions)
+    # Compaction that was interrupted before the journal was removed
+    data_file.write_text(dumped(tracker.sessions[:1]), encoding="utf-8")
+    with open(tracker.journal_file, "a", encoding="utf-8") as f:
+        f.write('[2, {"wave": ')
+
+    reloaded = TowerStatsTracker(str(data_file))
+
+    assert reloaded.sessions == tracker.sessions
+
+
+def test_append_after_torn_journal_reload(tmp_path):
+    data_file = tmp_path / "tower_stats.json"
+    tracker = TowerStatsTracker(str(data_file))
+    tracker.add_sessions(["Wave  1", "Wave  2"], save=False)
+    tracker.append_journal(0, tracker.sessions)
+    with open(tracker.journal_file, "a", encoding="utf-8") as f:
+        f.write('[2, {"wave": ')
+
+    reloaded = TowerStatsTracker(str(data_file))
+    reloaded.add_sessions(["Wave  3", "Wave  4"], save=False)
+    reloaded.append_journal(2, reloaded.sessions[2:])
+
+    after_restart = TowerStatsTracker(str(data_file))
+    assert [session["wave"] for session in after_restart.sessions] == [1, 2, 3, 4]
+    assert after_restart.journal_entries == 4
+
+
+def test_get_comparison(tmp_path):
+    tracker = TowerStatsTracker(str(tmp_path / "tower_stats.json"))
+    tracker.add_sessions(["Wave  10\nTotal Enemies  5", "Wave  20\nCoins Earned  1,5T"])
+
+    comparison = tracker.get_comparison(0, 1)
+
+    assert comparison["wave"] == [10, 20]
+    assert comparison["total_enemies"] == [5, 0]
+    assert comparison["coins_earned"] == ["", "1,5T"]
+    assert comparison["session_1"] != comparison["session_2"]
+    assert tracker.get_comparison(0, 2) is None
+    assert tracker.get_comparison(5, 0) is None
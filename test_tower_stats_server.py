@@ -0,0 +1,271 @@
+"""End-to-end tests for the Tower statistics HTTP service on localhost."""
+
+import json
+import asyncio
+
+import pytest
+
+import tower_stats_server
+from tower_stats import TowerStatsTracker
+from tower_stats_server import HTTPError, TowerStatsHTTPServer, TowerStatsService
+
+STATS = "Tier  11\nWave  9743\nKilled By  Ray\nTotal Enemies  837873"
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    return status, headers, json.loads(body)
+
+
+def encode_request(method, path, body=b"", headers=None):
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(body)}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def request(port, method, path, body=b"", headers=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(encode_request(method, path, body, headers))
+        status, _, payload = await read_response(reader)
+        return status, payload
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def post_json(port, path, data):
+    body = json.dumps(data).encode("utf-8")
+    return await request(port, "POST", path, body, {"Content-Type": "application/json"})
+
+
+def run_service(tmp_path, scenario, idle_timeout=30.0, **service_options):
+    """Run ``scenario(service, port)`` against a service on an ephemeral port."""
+    service_options.setdefault("flush_interval", 0.01)
+
+    async def main():
+        tracker = TowerStatsTracker(str(tmp_path / "tower_stats.json"))
+        service = TowerStatsService(tracker, **service_options)
+        await service.start()
+        http = TowerStatsHTTPServer(service, idle_timeout=idle_timeout)
+        server = await asyncio.start_server(http.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            await scenario(service, port)
+        finally:
+            server.close()
+            await service.stop()
+        return service
+
+    return asyncio.run(main())
+
+
+def test_batch_ingest_and_queries(tmp_path):
+    async def scenario(service, port):
+        status, payload = await post_json(port, "/sessions", {"stats": [STATS, STATS, STATS]})
+        assert status == 201
+        assert payload["added"] == 3
+        assert [session["index"] for session in payload["sessions"]] == [0, 1, 2]
+        assert len({session["session_id"] for session in payload["sessions"]}) == 3
+
+        text = f"{STATS}\n\n  \nTier\t12\nWave\t100\n".encode("utf-8")
+        status, payload = await request(port, "POST", "/sessions", text)
+        assert status == 201
+        assert [(s["tier"], s["wave"]) for s in payload["sessions"]] == [(11, 9743), (12, 100)]
+
+        status, payload = await request(port, "GET", "/sessions?offset=1&limit=2")
+        assert status == 200
+        assert payload["total"] == 5
+        assert [session["wave"] for session in payload["sessions"]] == [9743, 9743]
+
+        status, payload = await request(port, "GET", "/sessions/latest")
+        assert (status, payload["tier"]) == (200, 12)
+
+        status, payload = await request(port, "GET", "/sessions/0")
+        assert (status, payload["killed_by"]) == (200, "Ray")
+
+        status, payload = await request(port, "GET", "/compare?a=0&b=4")
+        assert status == 200
+        assert payload["wave"] == [9743, 100]
+        assert payload["session_1"] != payload["session_2"]
+
+        status, payload = await request(port, "GET", "/health")
+        assert (status, payload["status"], payload["sessions"]) == (200, "ok", 5)
+
+    run_service(tmp_path, scenario)
+
+
+@pytest.mark.parametrize("method, path, body, headers, expected", [
+    ("GET", "/sessions/latest", b"", None, 404),
+    ("GET", "/sessions/0", b"", None, 404),
+    ("GET", "/sessions/abc", b"", None, 400),
+    ("GET", "/sessions/-1", b"", None, 400),
+    ("GET", "/sessions?limit=x", b"", None, 400),
+    ("GET", "/compare?a=0", b"", None, 400),
+    ("GET", "/compare?a=0&b=1", b"", None, 404),
+    ("GET", "/nope", b"", None, 404),
+    ("DELETE", "/health", b"", None, 405),
+    ("PUT", "/sessions", b"", None, 405),
+    ("POST", "/sessions/latest", b"", None, 405),
+    ("POST", "/compare", b"", None, 405),
+    ("POST", "/sessions", b"", None, 400),
+    ("POST", "/sessions", b"\n\n", None, 400),
+    ("POST", "/sessions", b"{bad", {"Content-Type": "application/json"}, 400),
+    ("POST", "/sessions", b'{"stats": [1]}', {"Content-Type": "application/json"}, 400),
+    ("POST", "/sessions", b"\xff\xfe", None, 400),
+])
+def test_error_responses(tmp_path, method, path, body, headers, expected):
+    async def scenario(service, port):
+        status, payload = await request(port, method, path, body, headers)
+        assert status == expected
+        assert "error" in payload
+
+    run_service(tmp_path, scenario)
+
+
+def test_oversized_body_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(tower_stats_server, "MAX_BODY_BYTES", 10)
+
+    async def scenario(service, port):
+        status, payload = await request(port, "POST", "/sessions", STATS.encode("utf-8"))
+        assert status == 413
+
+    run_service(tmp_path, scenario)
+
+
+def test_keep_alive_and_connection_close(tmp_path):
+    async def scenario(service, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(encode_request("GET", "/compare?a=0&b=x") + encode_request("GET", "/health"))
+        status, headers, _ = await read_response(reader)
+        assert (status, headers["connection"]) == (400, "keep-alive")
+        status, _, _ = await read_response(reader)
+        assert status == 200
+
+        writer.write(encode_request("GET", "/health", headers={"Connection": "close"}))
+        status, headers, _ = await read_response(reader)
+        assert (status, headers["connection"]) == (200, "close")
+        assert await reader.read() == b""
+        writer.close()
+        await writer.wait_closed()
+
+    run_service(tmp_path, scenario)
+
+
+def test_idle_connection_is_closed(tmp_path):
+    async def scenario(service, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        assert await asyncio.wait_for(reader.read(), 5) == b""
+        writer.close()
+        await writer.wait_closed()
+
+    run_service(tmp_path, scenario, idle_timeout=0.05)
+
+
+def test_stalled_body_is_closed(tmp_path):
+    async def scenario(service, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(encode_request("POST", "/sessions", STATS.encode("utf-8"))[:-5])
+        assert await asyncio.wait_for(reader.read(), 5) == b""
+        assert service.tracker.sessions == []
+        writer.close()
+        await writer.wait_closed()
+
+    run_service(tmp_path, scenario, idle_timeout=0.05)
+
+
+def test_stalled_response_is_dropped(tmp_path):
+    async def scenario(service, port):
+        # A response far larger than the socket buffers
+        service.tracker.sessions.extend({"notes": "x" * 10000} for _ in range(1000))
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(encode_request("GET", "/sessions?limit=1000"))
+        # Don't read while the server is blocked writing the response
+        await asyncio.sleep(0.5)
+
+        received = b""
+        try:
+            while chunk := await asyncio.wait_for(reader.read(65536), 5):
+                received += chunk
+        except ConnectionResetError:
+            pass
+        full_size = len(json.dumps({"total": 1000, "offset": 0, "sessions": service.tracker.sessions}))
+        assert len(received) < full_size
+        writer.close()
+
+    run_service(tmp_path, scenario, idle_timeout=0.1)
+
+
+def test_expect_100_continue(tmp_path):
+    async def scenario(service, port):
+        body = STATS.encode("utf-8")
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(encode_request("POST", "/sessions", body, {"Expect": "100-continue"})[:-len(body)])
+        assert await reader.readuntil(b"\r\n\r\n") == b"HTTP/1.1 100 Continue\r\n\r\n"
+        writer.write(body)
+        status, _, payload = await read_response(reader)
+        assert (status, payload["added"]) == (201, 1)
+        writer.close()
+        await writer.wait_closed()
+
+    run_service(tmp_path, scenario)
+
+
+def test_wait_returns_after_durable_write(tmp_path):
+    async def scenario(service, port):
+        status, _ = await post_json(port, "/sessions?wait=1", {"stats": [STATS, STATS]})
+        assert status == 201
+        assert service.pending_writes == 0
+        # Another process loading the data now sees the journaled sessions
+        assert len(TowerStatsTracker(str(tmp_path / "tower_stats.json")).sessions) == 2
+
+    run_service(tmp_path, scenario, flush_interval=0.05)
+
+
+def test_stop_flushes_and_compacts(tmp_path):
+    async def scenario(service, port):
+        status, _ = await post_json(port, "/sessions", {"stats": [STATS] * 3})
+        assert status == 201
+        assert service.pending_writes == 3
+
+    service = run_service(tmp_path, scenario, flush_interval=60)
+
+    saved = json.loads((tmp_path / "tower_stats.json").read_text(encoding="utf-8"))
+    assert saved == service.tracker.sessions
+    assert len(saved) == 3
+    assert not service.tracker.journal_file.exists()
+
+
+def test_compaction_while_running(tmp_path):
+    async def scenario(service, port):
+        for _ in range(3):
+            status, _ = await post_json(port, "/sessions?wait=1", {"stats": [STATS] * 2})
+            assert status == 201
+        # The journal reached compact_threshold and was folded into the data file
+        assert service.tracker.journal_entries < 6
+        assert (tmp_path / "tower_stats.json").exists()
+        assert len(TowerStatsTracker(str(tmp_path / "tower_stats.json")).sessions) == 6
+
+    run_service(tmp_path, scenario, compact_threshold=4)
+
+
+def test_ingest_rejected_when_not_running(tmp_path):
+    async def main():
+        service = TowerStatsService(TowerStatsTracker(str(tmp_path / "tower_stats.json")))
+        with pytest.raises(HTTPError) as before:
+            service.ingest([STATS])
+        await service.start()
+        await service.stop()
+        with pytest.raises(HTTPError) as after:
+            service.ingest([STATS])
+        return before.value.status, after.value.status
+
+    assert asyncio.run(main()) == (503, 503)
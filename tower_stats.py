@@ -4,13 +4,19 @@ The Tower Game Statistics Tracker
 Parses and stores game statistics from The Tower game.
 """
 
+import os
 import re
 import json
 import datetime
+import itertools
 from typing import Dict, Any, List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from pathlib import Path
 
+# The game exports "Field<TAB>Value"; hand-typed stats usually pad with spaces instead.
+FIELD_SEPARATOR = re.compile(r'\t+\s*|\s{2,}')
+INT_FORMATTING = re.compile(r'[,\s]')
+
 @dataclass
 class GameStats:
     """Data structure for storing Tower game statistics."""
@@ -211,58 +217,71 @@ class TowerStatsParser:
             "Common Modules": "common_modules",
             "Rare Modules": "rare_modules"
         }
+        self.int_fields = {f.name for f in fields(GameStats) if f.type is int or f.type == 'int'}
+        # Keeps session ids unique when many blocks are parsed within the same microsecond
+        self._session_counter = itertools.count()
 
     def parse_stats(self, stats_text: str) -> GameStats:
         """Parse game statistics from text format."""
-        stats = GameStats()
-        stats.timestamp = datetime.datetime.now().isoformat()
-        stats.session_id = f"session_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
-
-        lines = stats_text.strip().split('\n')
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
+        values: Dict[str, Any] = {}
 
+        for line in stats_text.strip().split('\n'):
             # Split on the first occurrence of whitespace that separates field name from value
-            parts = re.split(r'\s{2,}', line, 1)  # Split on 2+ spaces
+            parts = FIELD_SEPARATOR.split(line.strip(), 1)  # Split on a tab or 2+ spaces
             if len(parts) != 2:
                 continue
 
-            field_name = parts[0].strip()
+            attr_name = self.field_mappings.get(parts[0].strip())
+            if attr_name is None:
+                continue
+
             field_value = parts[1].strip()
 
-            if field_name in self.field_mappings:
-                attr_name = self.field_mappings[field_name]
-
-                # Convert to appropriate type
-                if hasattr(stats, attr_name):
-                    current_value = getattr(stats, attr_name)
-                    if isinstance(current_value, int):
-                        # Try to convert to int, removing commas and other formatting
-                        clean_value = re.sub(r'[,\s]', '', field_value)
-                        try:
-                            setattr(stats, attr_name, int(clean_value))
-                        except ValueError:
-                            setattr(stats, attr_name, 0)
-                    else:
-                        # Keep as string for complex values like "2d 8h 12m 19s" or "110,82T"
-                        setattr(stats, attr_name, field_value)
-
-        return stats
+            # Convert to appropriate type
+            if attr_name in self.int_fields:
+                # Try to convert to int, removing commas and other formatting
+                try:
+                    values[attr_name] = int(INT_FORMATTING.sub('', field_value))
+                except ValueError:
+                    values[attr_name] = 0
+            else:
+                # Keep as string for complex values like "2d 8h 12m 19s" or "110,82T"
+                values[attr_name] = field_value
+
+        now = datetime.datetime.now()
+        values["timestamp"] = now.isoformat()
+        values["session_id"] = f"session_{now.strftime('%Y%m%d_%H%M%S_%f')}_{next(self._session_counter)}"
+        return GameStats(**values)
+
+def _fsync_directory(path: Path):
+    """Flush a directory entry change (rename, unlink) to disk where supported."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # Directories can't be opened on Windows; renames there are already durable
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
 
 class TowerStatsTracker:
     """Main application for tracking Tower game statistics."""
 
     def __init__(self, data_file: str = "tower_stats.json"):
         self.data_file = Path(data_file)
+        # Sessions appended since the data file was last written, one
+        # [index, session] JSON array per line
+        self.journal_file = self.data_file.with_suffix('.journal.jsonl')
         self.parser = TowerStatsParser()
         self.sessions: List[Dict[str, Any]] = []
+        self.journal_entries = 0
         self.load_data()
 
     def load_data(self):
-        """Load existing statistics data."""
+        """Load existing statistics data, including journaled sessions."""
         if self.data_file.exists():
             try:
                 with open(self.data_file, 'r', encoding='utf-8') as f:
@@ -270,17 +289,84 @@ class TowerStatsTracker:
             except (json.JSONDecodeError, FileNotFoundError):
                 self.sessions = []
 
-    def save_data(self):
-        """Save statistics data to file."""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.sessions, f, indent=2, ensure_ascii=False)
+        self.journal_entries = 0
+        if self.journal_file.exists():
+            good_end = 0
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("unterminated line")
+                        index, session = json.loads(line)
+                    except ValueError:
+                        # A torn final line from an interrupted append
+                        break
+                    good_end += len(line)
+                    self.journal_entries += 1
+                    # Entries below len(sessions) were already compacted into the data file
+                    if index == len(self.sessions):
+                        self.sessions.append(session)
+                torn = f.seek(0, os.SEEK_END) > good_end
+            if torn:
+                # Drop the torn tail so the next append starts on a fresh line
+                os.truncate(self.journal_file, good_end)
+
+    def save_data(self, sessions: Optional[List[Dict[str, Any]]] = None):
+        """Save statistics data to file and clear the journal.
+
+        Pass a snapshot of ``sessions`` when saving from another thread so the
+        list is not mutated while it is being serialized.
+        """
+        if sessions is None:
+            sessions = self.sessions
+
+        tmp_file = self.data_file.with_name(self.data_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(sessions, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.data_file)
+
+        if self.journal_file.exists():
+            # The rename must be on disk before the journal it replaces is gone
+            _fsync_directory(self.data_file.parent)
+            self.journal_file.unlink()
+        self.journal_entries = 0
+
+    def append_journal(self, first_index: int, sessions: List[Dict[str, Any]]):
+        """Durably append sessions to the journal without rewriting the data file.
+
+        ``first_index`` is the position of ``sessions[0]`` in the full session list.
+        """
+        data = ''.join(
+            json.dumps([first_index + offset, session], ensure_ascii=False) + '\n'
+            for offset, session in enumerate(sessions)
+        ).encode('utf-8')
+        with open(self.journal_file, 'ab', buffering=0) as f:
+            start = f.seek(0, os.SEEK_END)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[f.write(view):]
+                os.fsync(f.fileno())
+            except OSError:
+                # Don't leave a partial line for the next append to join onto
+                os.ftruncate(f.fileno(), start)
+                raise
+        self.journal_entries += len(sessions)
 
     def add_session(self, stats_text: str) -> GameStats:
         """Add a new game session from text input."""
-        stats = self.parser.parse_stats(stats_text)
-        self.sessions.append(asdict(stats))
-        self.save_data()
-        return stats
+        return self.add_sessions([stats_text])[0]
+
+    def add_sessions(self, stats_texts: List[str], save: bool = True) -> List[GameStats]:
+        """Add several game sessions, writing the data file at most once."""
+        added = [self.parser.parse_stats(text) for text in stats_texts]
+        # GameStats is flat, so a shallow copy matches asdict() at a fraction of the cost
+        self.sessions.extend(dict(vars(stats)) for stats in added)
+        if save and added:
+            self.save_data()
+        return added
 
     def get_sessions(self) -> List[Dict[str, Any]]:
         """Get all recorded sessions."""
@@ -304,21 +390,35 @@ class TowerStatsTracker:
         print(f"Total Enemies: {session.get('total_enemies', 0)}")
         print(f"Damage Dealt: {session.get('damage_dealt', 'N/A')}")
 
-    def compare_sessions(self, session1_idx: int, session2_idx: int):
-        """Compare two sessions."""
+    def get_comparison(self, session1_idx: int, session2_idx: int) -> Optional[Dict[str, Any]]:
+        """Get the compared values of two sessions, or None for invalid indices."""
         if session1_idx >= len(self.sessions) or session2_idx >= len(self.sessions):
-            print("Invalid session indices")
-            return
+            return None
 
         s1 = self.sessions[session1_idx]
         s2 = self.sessions[session2_idx]
 
+        return {
+            "session_1": s1.get('session_id', 'Unknown'),
+            "session_2": s2.get('session_id', 'Unknown'),
+            "wave": [s1.get('wave', 0), s2.get('wave', 0)],
+            "total_enemies": [s1.get('total_enemies', 0), s2.get('total_enemies', 0)],
+            "coins_earned": [s1.get('coins_earned', 'N/A'), s2.get('coins_earned', 'N/A')],
+        }
+
+    def compare_sessions(self, session1_idx: int, session2_idx: int):
+        """Compare two sessions."""
+        comparison = self.get_comparison(session1_idx, session2_idx)
+        if comparison is None:
+            print("Invalid session indices")
+            return
+
         print(f"\n=== Session Comparison ===")
-        print(f"Session 1: {s1.get('session_id', 'Unknown')}")
-        print(f"Session 2: {s2.get('session_id', 'Unknown')}")
-        print(f"Wave Progress: {s1.get('wave', 0)} vs {s2.get('wave', 0)}")
-        print(f"Total Enemies: {s1.get('total_enemies', 0)} vs {s2.get('total_enemies', 0)}")
-        print(f"Coins Earned: {s1.get('coins_earned', 'N/A')} vs {s2.get('coins_earned', 'N/A')}")
+        print(f"Session 1: {comparison['session_1']}")
+        print(f"Session 2: {comparison['session_2']}")
+        print(f"Wave Progress: {comparison['wave'][0]} vs {comparison['wave'][1]}")
+        print(f"Total Enemies: {comparison['total_enemies'][0]} vs {comparison['total_enemies'][1]}")
+        print(f"Coins Earned: {comparison['coins_earned'][0]} vs {comparison['coins_earned'][1]}")
 
 def main():
     """Main application entry point."""
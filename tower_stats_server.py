@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+The Tower Game Statistics Service
+Local asyncio HTTP service around TowerStatsParser and TowerStatsTracker,
+so the Node server and the Discord bot can ingest and query runs without
+spawning a process per request.
+
+Endpoints:
+    GET  /health                  service status
+    POST /sessions                ingest one or more stat blocks
+    GET  /sessions?offset=&limit= list recorded sessions
+    GET  /sessions/latest         most recent session
+    GET  /sessions/<index>        single session
+    GET  /compare?a=<i>&b=<j>     compare two sessions
+
+POST /sessions accepts JSON ({"stats": "..."} or {"stats": ["...", "..."]})
+or plain text with stat blocks separated by blank lines. Add ?wait=1 to
+respond only once the batch has been written to disk.
+"""
+
+import re
+import json
+import signal
+import asyncio
+import argparse
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from tower_stats import TowerStatsTracker
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 8 * 1024 * 1024
+DEFAULT_LIST_LIMIT = 100
+IDLE_TIMEOUT = 30.0
+
+BLOCK_SEPARATOR = re.compile(r'\n[ \t]*\n')
+
+REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """Error that is reported to the client as a JSON response."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class TowerStatsService:
+    """In-process tracker with micro-batched, append-only writes.
+
+    Ingested sessions are appended to the tracker's journal, so each write
+    costs only as much as the new sessions. The journal is compacted into
+    the data file on stop, and while running once it holds at least
+    ``compact_threshold`` entries and half as many as the full history.
+    """
+
+    def __init__(self, tracker: TowerStatsTracker, flush_interval: float = 0.05,
+                 flush_batch_size: int = 1000, compact_threshold: int = 10000):
+        self.tracker = tracker
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.compact_threshold = compact_threshold
+        self._written = len(tracker.sessions)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flushed: Optional[asyncio.Future] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._closing = False
+
+    @property
+    def pending_writes(self) -> int:
+        """Number of ingested sessions not yet written to disk."""
+        return len(self.tracker.sessions) - self._written
+
+    async def start(self):
+        """Start the background writer."""
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._flushed = asyncio.get_running_loop().create_future()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Write any pending sessions, compact the journal and stop the writer."""
+        self._closing = True
+        if self._flush_task is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            await self._flush_task
+            self._flush_task = None
+
+    def ingest(self, stats_texts: List[str]) -> Tuple[List[Dict[str, Any]], asyncio.Future]:
+        """Parse and record stat blocks; returns summaries and a write future.
+
+        Sessions are queryable immediately. They are written by the
+        background writer, which coalesces every batch that arrives within
+        ``flush_interval`` into a single journal append.
+        """
+        if self._flush_task is None or self._closing:
+            raise HTTPError(503, "Service is not accepting sessions")
+
+        first_index = len(self.tracker.sessions)
+        added = self.tracker.add_sessions(stats_texts, save=False)
+        written = self._flushed
+        self._wakeup.set()
+
+        summaries = [
+            {
+                "index": first_index + offset,
+                "session_id": stats.session_id,
+                "tier": stats.tier,
+                "wave": stats.wave,
+            }
+            for offset, stats in enumerate(added)
+        ]
+        return summaries, written
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            if self.pending_writes < self.flush_batch_size and not self._closing:
+                # Give concurrent requests a moment to join this write,
+                # but don't hold up stop()
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+            failed = False
+            if self.pending_writes:
+                end = len(self.tracker.sessions)
+                batch = self.tracker.sessions[self._written:end]
+                written = self._flushed
+                self._flushed = loop.create_future()
+                try:
+                    await loop.run_in_executor(None, self.tracker.append_journal, self._written, batch)
+                except Exception as e:
+                    # Leave the sessions pending so the next ingest retries the write
+                    failed = True
+                    print(f"Error saving sessions: {e}")
+                    written.set_exception(e)
+                    # Nobody may be awaiting this write; don't warn about it
+                    written.exception()
+                else:
+                    self._written = end
+                    written.set_result(end)
+
+            if not failed and self.tracker.journal_entries and (
+                    self._closing or self._should_compact()):
+                snapshot = self.tracker.sessions[:self._written]
+                try:
+                    await loop.run_in_executor(None, self.tracker.save_data, snapshot)
+                except Exception as e:
+                    # The journal still holds every session, so nothing is lost
+                    print(f"Error compacting sessions: {e}")
+
+            if self._closing and (failed or not self.pending_writes):
+                return
+
+    def _should_compact(self) -> bool:
+        # Compacting rewrites the whole history, so only do it once the journal
+        # has grown by a fraction of that history; this keeps the cost per
+        # ingested session constant however large the data file gets.
+        journal_entries = self.tracker.journal_entries
+        return journal_entries >= max(self.compact_threshold, self._written // 2)
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "sessions": len(self.tracker.sessions),
+            "pending_writes": self.pending_writes,
+        }
+
+
+def split_stat_blocks(text: str) -> List[str]:
+    """Split plain text into stat blocks separated by blank lines."""
+    return [block for block in BLOCK_SEPARATOR.split(text.replace('\r\n', '\n')) if block.strip()]
+
+
+def parse_index(value: Optional[str], name: str) -> int:
+    """Parse a non-negative session index from a path or query value."""
+    if value is None:
+        raise HTTPError(400, f"Missing parameter: {name}")
+    try:
+        index = int(value)
+    except ValueError:
+        raise HTTPError(400, f"Invalid {name}: {value}")
+    if index < 0:
+        raise HTTPError(400, f"Invalid {name}: {value}")
+    return index
+
+
+class IdleTimer:
+    """Drops a connection once it has been idle for ``timeout`` seconds.
+
+    Touching the timer only records a timestamp, so keep-alive requests
+    don't each pay for scheduling and cancelling a timeout.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, timeout: float):
+        self.writer = writer
+        self.timeout = timeout
+        self.busy = False
+        self._loop = asyncio.get_running_loop()
+        self.touch()
+        self._handle = self._loop.call_later(timeout, self._check)
+
+    def touch(self):
+        self._last_activity = self._loop.time()
+
+    def cancel(self):
+        self._handle.cancel()
+
+    def _check(self):
+        remaining = self._last_activity + self.timeout - self._loop.time()
+        if self.busy or remaining > 0:
+            self._handle = self._loop.call_later(remaining if remaining > 0 else self.timeout, self._check)
+        else:
+            # Abort rather than close so a write stuck on a client that
+            # stopped reading fails too; the handler then returns
+            self.writer.transport.abort()
+
+
+class TowerStatsHTTPServer:
+    """Minimal HTTP/1.1 server with keep-alive, routing to TowerStatsService."""
+
+    def __init__(self, service: TowerStatsService, idle_timeout: float = IDLE_TIMEOUT):
+        self.service = service
+        self.idle_timeout = idle_timeout
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        idle = IdleTimer(writer, self.idle_timeout)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 431, {"error": "Request headers too large"}, False)
+                    break
+
+                keep_alive = False
+                body = None
+                try:
+                    method, target, headers, keep_alive = self._parse_head(head)
+                    idle.touch()
+                    body = await self._read_body(reader, writer, headers)
+                    idle.busy = True
+                    status, payload = await self.dispatch(method, target, headers, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                    if body is None:
+                        # The unread body would be taken for the next request
+                        keep_alive = False
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+
+                # A client that stops reading the response is covered by the idle timeout
+                idle.touch()
+                idle.busy = False
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            idle.cancel()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Tuple[str, str, Dict[str, str], bool]:
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ', 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(':')
+            if not sep:
+                raise HTTPError(400, "Malformed header")
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            keep_alive = connection != 'close'
+        else:
+            keep_alive = connection == 'keep-alive'
+        return method.upper(), target, headers, keep_alive
+
+    async def _read_body(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                         headers: Dict[str, str]) -> bytes:
+        if 'transfer-encoding' in headers:
+            raise HTTPError(411, "Chunked requests are not supported; send Content-Length")
+        try:
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+        if not length:
+            return b""
+        if headers.get('expect', '').lower() == '100-continue':
+            # Clients such as curl otherwise wait before sending large bodies
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+        return await reader.readexactly(length)
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any], keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"\r\n"
+        ).encode('latin-1')
+        writer.write(head + body)
+        await writer.drain()
+
+    async def dispatch(self, method: str, target: str, headers: Dict[str, str],
+                       body: bytes) -> Tuple[int, Dict[str, Any]]:
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        tracker = self.service.tracker
+
+        if path == '/health':
+            self._require(method, 'GET')
+            return 200, self.service.health()
+
+        if path == '/sessions':
+            if method == 'POST':
+                return await self._ingest(headers, body, query)
+            self._require(method, 'GET')
+            offset = parse_index(query.get('offset', '0'), 'offset')
+            limit = parse_index(query.get('limit', str(DEFAULT_LIST_LIMIT)), 'limit')
+            return 200, {
+                "total": len(tracker.sessions),
+                "offset": offset,
+                "sessions": tracker.sessions[offset:offset + limit],
+            }
+
+        if path == '/sessions/latest':
+            self._require(method, 'GET')
+            latest = tracker.get_latest_session()
+            if latest is None:
+                raise HTTPError(404, "No sessions recorded yet")
+            return 200, latest
+
+        if path.startswith('/sessions/'):
+            self._require(method, 'GET')
+            index = parse_index(path[len('/sessions/'):], 'session index')
+            if index >= len(tracker.sessions):
+                raise HTTPError(404, f"Session {index} not found")
+            return 200, tracker.sessions[index]
+
+        if path == '/compare':
+            self._require(method, 'GET')
+            comparison = tracker.get_comparison(parse_index(query.get('a'), 'a'),
+                                                parse_index(query.get('b'), 'b'))
+            if comparison is None:
+                raise HTTPError(404, "Invalid session indices")
+            return 200, comparison
+
+        raise HTTPError(404, f"Unknown endpoint: {path}")
+
+    @staticmethod
+    def _require(method: str, allowed: str):
+        if method != allowed:
+            raise HTTPError(405, f"Method {method} not allowed")
+
+    async def _ingest(self, headers: Dict[str, str], body: bytes,
+                      query: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        try:
+            text = body.decode('utf-8')
+        except UnicodeDecodeError:
+            raise HTTPError(400, "Request body must be UTF-8")
+
+        if headers.get('content-type', '').startswith('application/json'):
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError as e:
+                raise HTTPError(400, f"Invalid JSON: {e}")
+            stats = data.get('stats') if isinstance(data, dict) else None
+            if isinstance(stats, str):
+                stats = [stats]
+            if not isinstance(stats, list) or not all(isinstance(block, str) for block in stats):
+                raise HTTPError(400, 'Expected {"stats": "..."} or {"stats": ["...", ...]}')
+            blocks = [block for block in stats if block.strip()]
+        else:
+            blocks = split_stat_blocks(text)
+
+        if not blocks:
+            raise HTTPError(400, "No statistics provided")
+
+        sessions, written = self.service.ingest(blocks)
+        if query.get('wait') in ('1', 'true'):
+            await asyncio.shield(written)
+        return 201, {"success": True, "added": len(sessions), "sessions": sessions}
+
+
+async def serve(host: str, port: int, data_file: str, flush_interval: float):
+    """Run the service until cancelled or sent SIGTERM."""
+    service = TowerStatsService(TowerStatsTracker(data_file), flush_interval=flush_interval)
+    await service.start()
+    http = TowerStatsHTTPServer(service)
+    server = await asyncio.start_server(http.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+    print(f"Tower stats service listening on http://{host}:{port} "
+          f"({len(service.tracker.sessions)} sessions loaded from {data_file})")
+    stopping = asyncio.Event()
+    try:
+        # Process managers stop the service with SIGTERM; shut down as for Ctrl+C
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+    except (NotImplementedError, AttributeError):
+        # Not available on Windows event loops
+        pass
+
+    try:
+        await stopping.wait()
+    finally:
+        server.close()
+        await service.stop()
+
+
+def main():
+    """Service entry point."""
+    parser = argparse.ArgumentParser(description="Local HTTP service for The Tower statistics tracker")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--data-file", default="tower_stats.json", help="Tracker data file")
+    parser.add_argument("--flush-interval", type=float, default=0.05,
+                        help="Seconds to coalesce ingested sessions before writing (default: 0.05)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.data_file, args.flush_interval))
+    except KeyboardInterrupt:
+        print("Goodbye!")
+
+if __name__ == "__main__":
+    main()